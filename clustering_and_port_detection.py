@@ -3,84 +3,127 @@ import pandas as pd
 import numpy as np
 from sklearn.cluster import DBSCAN
 import multiprocessing as mp
+from contextlib import nullcontext
 
+try:  # Optional GPU backend for DBSCAN
+    import cupy as cp
+    from cuml.cluster import DBSCAN as cuDBSCAN
+except ImportError:
+    cp = None
+    cuDBSCAN = None
 
-def process_single_mmsi_stops(args_tuple):
+
+NANOSECONDS_PER_HOUR = 3_600_000_000_000
+
+
+def _segment_means(
+    values: np.ndarray, segment_starts: np.ndarray, segment_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the mean of values over each [start, end) segment with a single reduceat
+    call. Only the listed segments are reduced, so rejected segments cost nothing.
+    """
+    if len(segment_starts) == 0:
+        return np.empty(0, dtype=np.float64)
+    # Interleave (start, end) pairs; every even output sums one segment. A final end
+    # equal to len(values) is dropped because reduceat already runs to the array end.
+    bounds = np.column_stack((segment_starts, segment_ends)).ravel()
+    if bounds[-1] == len(values):
+        bounds = bounds[:-1]
+    return np.add.reduceat(values, bounds)[::2] / (segment_ends - segment_starts)
+
+
+def _first_valid_per_segment(
+    values: pd.Series, segment_starts: np.ndarray, segment_ends: np.ndarray
+) -> np.ndarray:
+    """
+    Returns the first non-null value of each segment as a string, or "N/A"
+    when the segment has no valid value.
+    """
+    valid_positions = np.flatnonzero(values.notna().to_numpy())
+    # Position of the first valid value at or after each segment start (len(values) if none)
+    first_valid = np.append(valid_positions, len(values))[
+        np.searchsorted(valid_positions, segment_starts)
+    ]
+    has_valid = first_valid < segment_ends
+    labels = np.full(len(segment_starts), "N/A", dtype=object)
+    labels[has_valid] = values.iloc[first_valid[has_valid]].astype(str).to_numpy()
+    return labels
+
+
+def _detect_stops(
+    sorted_df: pd.DataFrame,
+    min_stop_duration_threshold: timedelta,
+    max_time_diff_within_stop_threshold: timedelta,
+) -> pd.DataFrame:
     """
-    Processes AIS data for a single MMSI to find significant stop events.
-    Expected tuple: (mmsi, ship_data_df, min_stop_duration_thresh, max_time_diff_thresh)
+    Finds significant stop events in a DataFrame sorted by (MMSI, Timestamp).
+    A new stop segment starts whenever the MMSI changes or the gap between
+    consecutive pings exceeds max_time_diff_within_stop_threshold.
+    """
+    # All time arithmetic runs on int64 nanoseconds; only the emitted stop
+    # boundaries are converted back to datetimes.
+    timestamps_ns = sorted_df["Timestamp"].to_numpy(dtype="datetime64[ns]").view("i8")
+    max_gap_ns = pd.Timedelta(max_time_diff_within_stop_threshold).value
+    min_duration_ns = pd.Timedelta(min_stop_duration_threshold).value
+
+    mmsi_values = sorted_df["MMSI"].to_numpy()
+    segment_break = np.empty(len(mmsi_values), dtype=bool)
+    segment_break[0] = True
+    np.not_equal(mmsi_values[1:], mmsi_values[:-1], out=segment_break[1:])
+    segment_break[1:] |= np.diff(timestamps_ns) > max_gap_ns
+    segment_starts = np.flatnonzero(segment_break)
+
+    # Segments are time-sorted, so their first and last pings bound the duration.
+    # Rejecting short segments first leaves only survivors for the reductions below.
+    segment_ends = np.append(segment_starts[1:], len(timestamps_ns))
+    start_times = timestamps_ns[segment_starts]
+    end_times = timestamps_ns[segment_ends - 1]
+    durations = end_times - start_times
+    significant = durations >= min_duration_ns
+    segment_starts = segment_starts[significant]
+    segment_ends = segment_ends[significant]
+
+    return pd.DataFrame(
+        {
+            "MMSI": mmsi_values[segment_starts],
+            "stop_latitude": _segment_means(
+                sorted_df["Latitude"].to_numpy(dtype=np.float64),
+                segment_starts,
+                segment_ends,
+            ),
+            "stop_longitude": _segment_means(
+                sorted_df["Longitude"].to_numpy(dtype=np.float64),
+                segment_starts,
+                segment_ends,
+            ),
+            "stop_start_time": start_times[significant].view("datetime64[ns]"),
+            "stop_end_time": end_times[significant].view("datetime64[ns]"),
+            "stop_duration_hours": durations[significant] / NANOSECONDS_PER_HOUR,
+            "num_pings_in_stop": segment_ends - segment_starts,
+            "Ship type": _first_valid_per_segment(
+                sorted_df["Ship type"], segment_starts, segment_ends
+            ),
+            "Navigational status": _first_valid_per_segment(
+                sorted_df["Navigational status"], segment_starts, segment_ends
+            ),
+        }
+    )
+
+
+def process_mmsi_chunk_stops(args_tuple):
+    """
+    Worker function to find significant stop events for a contiguous block of MMSIs.
+    Expected tuple: (chunk_df, min_stop_duration_thresh, max_time_diff_thresh)
     """
     (
-        mmsi,
-        ship_data_df,
+        chunk_df,
         min_stop_duration_threshold,
         max_time_diff_within_stop_threshold,
     ) = args_tuple
-
-    processed_stops_list = []
-    if ship_data_df.empty:
-        return pd.DataFrame(processed_stops_list)
-
-    ship_data = ship_data_df.copy()
-    ship_data = ship_data.sort_values(by="Timestamp").reset_index(drop=True)
-
-    ship_data["time_diff"] = ship_data["Timestamp"].diff()
-    ship_data["stop_segment_id"] = (
-        ship_data["time_diff"].isna()
-        | (ship_data["time_diff"] > max_time_diff_within_stop_threshold)
-    ).cumsum()
-
-    grouped_by_segment = ship_data.groupby("stop_segment_id")
-
-    for _segment_id, segment_data in grouped_by_segment:
-        if segment_data.empty:
-            continue
-
-        start_time = segment_data["Timestamp"].min()
-        end_time = segment_data["Timestamp"].max()
-        duration = timedelta(0) if len(segment_data) == 1 else end_time - start_time
-
-        if duration >= min_stop_duration_threshold:
-            mean_latitude = segment_data["Latitude"].mean()
-            mean_longitude = segment_data["Longitude"].mean()
-
-            ship_type = "N/A"
-            if (
-                "Ship type" in segment_data.columns
-                and not segment_data["Ship type"].empty
-            ):
-                # Check if all values are NaN or if there's at least one valid string
-                first_valid_ship_type = (
-                    segment_data["Ship type"].dropna().astype(str).unique()
-                )
-                if len(first_valid_ship_type) > 0:
-                    ship_type = first_valid_ship_type[0]
-
-            nav_status = "N/A"
-            if (
-                "Navigational status" in segment_data.columns
-                and not segment_data["Navigational status"].empty
-            ):
-                first_valid_nav_status = (
-                    segment_data["Navigational status"].dropna().astype(str).unique()
-                )
-                if len(first_valid_nav_status) > 0:
-                    nav_status = first_valid_nav_status[0]
-
-            processed_stops_list.append(
-                {
-                    "MMSI": mmsi,
-                    "stop_latitude": mean_latitude,
-                    "stop_longitude": mean_longitude,
-                    "stop_start_time": start_time,
-                    "stop_end_time": end_time,
-                    "stop_duration_hours": duration.total_seconds() / 3600,
-                    "num_pings_in_stop": len(segment_data),
-                    "Ship type": ship_type,
-                    "Navigational status": nav_status,
-                }
-            )
-    return pd.DataFrame(processed_stops_list)
+    return _detect_stops(
+        chunk_df, min_stop_duration_threshold, max_time_diff_within_stop_threshold
+    )
 
 
 def get_significant_stops_parallel(
@@ -88,9 +131,13 @@ def get_significant_stops_parallel(
     min_stop_duration_threshold: timedelta,
     max_time_diff_within_stop_threshold: timedelta,
     num_processes: int = None,
+    pool=None,
 ) -> pd.DataFrame:
     """
-    Identifies significant stop events in parallel by processing each MMSI's data separately.
+    Identifies significant stop events in parallel. The data is sorted by (MMSI, Timestamp)
+    once and split into one contiguous, MMSI-aligned block per process, so each worker
+    receives a single pickled DataFrame instead of one per MMSI.
+    An existing multiprocessing pool can be passed in to avoid starting a new one.
     """
     if num_processes is None:
         num_processes = mp.cpu_count()
@@ -112,36 +159,56 @@ def get_significant_stops_parallel(
         )
         return pd.DataFrame()
 
-    # Prepare arguments for each task. Each task processes data for one MMSI.
-    # df.groupby("MMSI") creates an iterator of (name, group_df)
-    # We create a list of tuples: (mmsi_value, mmsi_dataframe_group, threshold1, threshold2)
+    # Pings without a parseable timestamp can never extend a stop segment.
+    # The (MMSI, Timestamp) order is computed on the raw arrays and each required
+    # column is gathered once, instead of copying the frame for select, dropna and sort.
+    valid_rows = np.flatnonzero(df["Timestamp"].notna().to_numpy())
+    if len(valid_rows) == 0:
+        print("No data to process for stop detection.")
+        return pd.DataFrame()
+
+    timestamps_ns = df["Timestamp"].to_numpy(dtype="datetime64[ns]").view("i8")
+    order = valid_rows[
+        np.lexsort((timestamps_ns[valid_rows], df["MMSI"].to_numpy()[valid_rows]))
+    ]
+    sorted_df = pd.DataFrame(
+        {col_name: df[col_name].array.take(order) for col_name in required_columns}
+    )
+
+    # Split at MMSI boundaries closest to equal row counts so no ship spans two blocks
+    mmsi_values = sorted_df["MMSI"].to_numpy()
+    mmsi_starts = np.flatnonzero(np.r_[True, mmsi_values[1:] != mmsi_values[:-1]])
+    row_targets = np.linspace(0, len(sorted_df), num_processes + 1)[1:-1]
+    chunk_starts = np.unique(
+        np.r_[
+            0,
+            mmsi_starts[np.searchsorted(mmsi_starts, row_targets, side="right") - 1],
+        ]
+    )
+    chunk_bounds = np.append(chunk_starts, len(sorted_df))
     tasks = [
         (
-            mmsi,
-            group_df,
+            sorted_df.iloc[chunk_start:chunk_end],
             min_stop_duration_threshold,
             max_time_diff_within_stop_threshold,
         )
-        for mmsi, group_df in df.groupby("MMSI")
-        if not group_df.empty
+        for chunk_start, chunk_end in zip(chunk_bounds[:-1], chunk_bounds[1:])
     ]
 
-    if not tasks:
-        print("No data to process after grouping by MMSI for stop detection.")
-        return pd.DataFrame()
-
     all_stops_dfs = []
     print(
-        f"Starting parallel stop detection with {num_processes} processes for {len(tasks)} MMSI groups..."
+        f"Starting parallel stop detection with {num_processes} processes for {len(mmsi_starts)} MMSI groups "
+        f"in {len(tasks)} blocks..."
+    )
+    pool_context = (
+        mp.Pool(processes=min(num_processes, len(tasks)))
+        if pool is None
+        else nullcontext(pool)  # Caller owns the pool and closes it
     )
-    with mp.Pool(processes=num_processes) as pool:
-        for i, result_df in enumerate(
-            pool.imap_unordered(process_single_mmsi_stops, tasks)
-        ):
+    with pool_context as active_pool:
+        for result_df in active_pool.imap(process_mmsi_chunk_stops, tasks):
             if not result_df.empty:
                 all_stops_dfs.append(result_df)
-            if (i + 1) % 1000 == 0:  # Simple progress bar
-                print(f"Processed {i+1}/{len(tasks)} MMSI groups for stops...")
 
     print(
         f"Finished parallel stop detection. Concatenating {len(all_stops_dfs)} results."
@@ -150,7 +217,9 @@ def get_significant_stops_parallel(
         print("No significant stops were found by any process.")
         return pd.DataFrame()
 
-    final_stops_df = pd.concat(all_stops_dfs, ignore_index=True)
+    final_stops_df = pd.concat(all_stops_dfs, ignore_index=True).astype(
+        {"Ship type": "category", "Navigational status": "category"}
+    )
     print(
         f"\nFound {len(final_stops_df)} significant stops (duration >= {min_stop_duration_threshold.total_seconds()/3600:.1f}h, "
         f"segment gap <= {max_time_diff_within_stop_threshold.total_seconds()/60:.0f}min)."
@@ -163,9 +232,13 @@ def cluster_stops_dbscan(
     stops_df: pd.DataFrame,
     eps_rad: float,
     min_samples: int,
+    use_gpu: bool = False,
+    max_mbytes_per_batch: int = None,
 ) -> pd.DataFrame:
     """
     Clusters stop events using DBSCAN based on their geographical coordinates.
+    With use_gpu=True the clustering runs on cuML when it is installed, with
+    max_mbytes_per_batch bounding GPU memory; otherwise scikit-learn is used.
     """
     if stops_df.empty:
         print("Stops DataFrame is empty. No clustering performed.")
@@ -180,28 +253,60 @@ def cluster_stops_dbscan(
         )
         stops_df["cluster"] = -1
         return stops_df
-    coords_radians = np.radians(stops_df[["stop_latitude", "stop_longitude"]].values)
-    db = DBSCAN(
-        eps=eps_rad,
-        min_samples=min_samples,
-        metric="haversine",
-        algorithm="ball_tree",
-        n_jobs=-1,  # Utilizing all available CPUs for DBSCAN
+    # Project onto the unit sphere: the chord length between two points grows
+    # monotonically with their haversine distance, so Euclidean DBSCAN on a KD-tree
+    # yields the same clusters without evaluating trig functions per distance probe.
+    lat_rad, lon_rad = np.radians(
+        stops_df[["stop_latitude", "stop_longitude"]].values
+    ).T
+    coords_xyz = np.column_stack(
+        (
+            np.cos(lat_rad) * np.cos(lon_rad),
+            np.cos(lat_rad) * np.sin(lon_rad),
+            np.sin(lat_rad),
+        )
     )
+    eps_chord = 2 * np.sin(eps_rad / 2)
+    if use_gpu and cuDBSCAN is None:
+        print("Warning: cuML is not available. Falling back to scikit-learn DBSCAN.")
     try:
-        stops_df["cluster"] = db.fit_predict(coords_radians)
+        if use_gpu and cuDBSCAN is not None:
+            db = cuDBSCAN(
+                eps=eps_chord,
+                min_samples=min_samples,
+                metric="euclidean",
+                max_mbytes_per_batch=max_mbytes_per_batch,
+            )
+            labels = db.fit_predict(cp.asarray(coords_xyz, dtype=cp.float32))
+            stops_df["cluster"] = cp.asnumpy(labels)
+        else:
+            db = DBSCAN(
+                eps=eps_chord,
+                min_samples=min_samples,
+                metric="euclidean",
+                algorithm="kd_tree",
+                n_jobs=-1,  # Utilizing all available CPUs for DBSCAN
+            )
+            stops_df["cluster"] = db.fit_predict(coords_xyz)
     except Exception as e:
         print(f"Error during DBSCAN fitting: {e}")
         stops_df["cluster"] = -2
     return stops_df
 
 
-def get_ship_type_distribution(series: pd.Series) -> str:
-    """ "
-    Returns a string summarizing the distribution of ship types in a Series.
+def _count_values_per_cluster(clusters_df: pd.DataFrame, column: str) -> pd.DataFrame:
     """
-    counts = series.value_counts()
-    return ", ".join([f"{ship_type}: {count}" for ship_type, count in counts.items()])
+    Counts each value of a column within every cluster with one groupby.size call.
+    Rows are ordered by cluster and then by descending count.
+    """
+    counts = (
+        clusters_df.groupby(["cluster", column], observed=True)
+        .size()
+        .reset_index(name="count")
+    )
+    return counts.sort_values(
+        by=["cluster", "count"], ascending=[True, False], kind="stable"
+    )
 
 
 def create_cluster_summary_df(clustered_stops_df: pd.DataFrame) -> pd.DataFrame:
@@ -212,38 +317,52 @@ def create_cluster_summary_df(clustered_stops_df: pd.DataFrame) -> pd.DataFrame:
     if "cluster" not in clustered_stops_df.columns:
         print("Error: 'cluster' column not found in clustered_stops_df.")
         return pd.DataFrame()
-    actual_clusters = clustered_stops_df[clustered_stops_df["cluster"] != -1].copy()
+    actual_clusters = clustered_stops_df[clustered_stops_df["cluster"] != -1]
     if actual_clusters.empty:
         print(
             "No actual clusters found (all points might be noise). Cannot create cluster summary."
         )
         return pd.DataFrame()
-    aggregations = {
-        "stop_latitude": "mean",
-        "stop_longitude": "mean",
-        "MMSI": "nunique",
-        "stop_duration_hours": ["mean", "sum", "count"],
-        "Ship type": lambda x: (x.mode()[0] if not x.mode().empty else "N/A"),
-        "Navigational status": lambda x: (x.mode()[0] if not x.mode().empty else "N/A"),
-    }
-    cluster_summary = actual_clusters.groupby("cluster").agg(aggregations)
-    cluster_summary.columns = [
-        "centroid_latitude",
-        "centroid_longitude",
-        "num_unique_ships",
-        "avg_stop_duration_hours",
-        "total_stop_duration_hours",
-        "num_stops",
-        "most_common_ship_type",
-        "most_common_navigational_status",
-    ]
-    ship_type_details = actual_clusters.groupby("cluster")["Ship type"].apply(
-        get_ship_type_distribution
+    cluster_summary = actual_clusters.groupby("cluster").agg(
+        centroid_latitude=("stop_latitude", "mean"),
+        centroid_longitude=("stop_longitude", "mean"),
+        num_unique_ships=("MMSI", "nunique"),
+        avg_stop_duration_hours=("stop_duration_hours", "mean"),
+        total_stop_duration_hours=("stop_duration_hours", "sum"),
+        num_stops=("stop_duration_hours", "count"),
+    )
+
+    # Most common values come from the (cluster x value) count table; ties resolve
+    # to the smallest value, as Series.mode() does.
+    ship_type_counts = _count_values_per_cluster(actual_clusters, "Ship type")
+    for column, summary_column, counts in [
+        ("Ship type", "most_common_ship_type", ship_type_counts),
+        (
+            "Navigational status",
+            "most_common_navigational_status",
+            _count_values_per_cluster(actual_clusters, "Navigational status"),
+        ),
+    ]:
+        most_common = counts.drop_duplicates(subset="cluster").set_index("cluster")
+        cluster_summary[summary_column] = (
+            most_common[column]
+            .astype(object)
+            .reindex(cluster_summary.index)
+            .fillna("N/A")
+        )
+
+    ship_type_details = (
+        (
+            ship_type_counts["Ship type"].astype(str)
+            + ": "
+            + ship_type_counts["count"].astype(str)
+        )
+        .groupby(ship_type_counts["cluster"])
+        .agg(", ".join)
     )
-    if not ship_type_details.empty:  # Check if ship_type_details is not empty
-        cluster_summary["ship_type_distribution"] = ship_type_details
-    else:
-        cluster_summary["ship_type_distribution"] = "N/A"  # Assign default if empty
+    cluster_summary["ship_type_distribution"] = ship_type_details.reindex(
+        cluster_summary.index
+    ).fillna("N/A")
 
     cluster_summary = cluster_summary.reset_index().rename(
         columns={"cluster": "cluster_id"}
@@ -26,6 +26,7 @@ EPS_KM = (
 )
 EPS_RAD = EPS_KM / EARTH_RADIUS_KM  # Convertion from kilometers to radians for DBSCAN
 MIN_SAMPLES_STOPS = 7  # Minimum number of samples to form a cluster for stop detection
+USE_GPU_DBSCAN = False  # Run DBSCAN on cuML when available
 
 
 if __name__ == "__main__":
@@ -33,16 +34,22 @@ if __name__ == "__main__":
     output_dir = "results"
     os.makedirs(output_dir, exist_ok=True)
     print("Starting data loading and preprocessing...")
-    df = load_and_preprocess_data_parallel(csv_path=DATA_PATH)
-    stops_df = get_significant_stops_parallel(
-        df,
-        min_stop_duration_threshold=MIN_STOP_DURATION,
-        max_time_diff_within_stop_threshold=MAX_TIME_DIFFERENCE_WITHIN_STOP,
-    )
+    # One worker pool is shared by the loading and stop detection stages
+    with mp.Pool(mp.cpu_count()) as pool:
+        df = load_and_preprocess_data_parallel(csv_path=DATA_PATH, pool=pool)
+        stops_df = get_significant_stops_parallel(
+            df,
+            min_stop_duration_threshold=MIN_STOP_DURATION,
+            max_time_diff_within_stop_threshold=MAX_TIME_DIFFERENCE_WITHIN_STOP,
+            pool=pool,
+        )
     print(f"\nFound {len(stops_df)} significant stop events.")
     if not stops_df.empty:
         clustered_stops_df = cluster_stops_dbscan(
-            stops_df, eps_rad=EPS_RAD, min_samples=MIN_SAMPLES_STOPS
+            stops_df,
+            eps_rad=EPS_RAD,
+            min_samples=MIN_SAMPLES_STOPS,
+            use_gpu=USE_GPU_DBSCAN,
         )
         print(f"\nClustered stops (potential ports are clusters != -1):")
         if "cluster" in clustered_stops_df.columns:
@@ -71,12 +78,14 @@ if __name__ == "__main__":
                     print(
                         f"Added polygons to {len(summary_with_polygons[summary_with_polygons['port_polygon_wkt'].notna()])} clusters."
                     )
-                    summary_with_polygons.to_excel(
-                        os.path.join(output_dir, "detected_ports_with_polygons.xlsx"),
+                    summary_with_polygons.to_parquet(
+                        os.path.join(
+                            output_dir, "detected_ports_with_polygons.parquet"
+                        ),
                         index=False,
                     )
-                    clustered_stops_df.to_excel(
-                        os.path.join(output_dir, "clustered_stops.xlsx"), index=False
+                    clustered_stops_df.to_parquet(
+                        os.path.join(output_dir, "clustered_stops.parquet"), index=False
                     )
                     print(
                         "\nGenerating and saving Folium map using function from utils.py..."
@@ -1,51 +1,112 @@
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+import pyarrow as pa
+from pyarrow import csv as pacsv
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import multiprocessing as mp
+from contextlib import nullcontext
+
+AIS_TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"  # e.g. 14/02/2025 00:00:00
+AIS_COLUMN_TYPES = {
+    "# Timestamp": pa.string(),  # Parsed in preprocess_chunk so bad values can be coerced
+    "MMSI": pa.int32(),
+    "Latitude": pa.float64(),
+    "Longitude": pa.float64(),
+    "Navigational status": pa.string(),
+    "SOG": pa.float32(),
+    "Ship type": pa.string(),
+}
+PROCESSED_COLUMNS = [col for col in AIS_COLUMN_TYPES if col != "# Timestamp"] + [
+    "Timestamp"
+]
+CATEGORICAL_COLUMNS = ["Ship type", "Navigational status"]
+CSV_BLOCK_SIZE = 1 << 26  # 64 MiB of raw CSV per block
+SCAN_BATCH_SIZE = 1_000_000  # Maximum rows per preprocessing task
+MAX_STOP_SOG = 2  # Pings faster than this (knots) are never part of a stop
 
 
 def preprocess_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
     """
     Preprocesses a single chunk of AIS data: drops NaNs, duplicates,
-    converts timestamp, and filters by SOG.
+    converts timestamp and stores the low-cardinality string columns
+    as categoricals. The SOG filter is already applied while scanning the CSV.
+    The row filters are fused into one boolean mask so the chunk is sliced only once,
+    and timestamps are parsed for the surviving rows only.
+    """
+    keep = chunk.notna().all(axis=1).to_numpy() & ~chunk.duplicated().to_numpy()
+    timestamps = pd.to_datetime(
+        chunk["# Timestamp"].to_numpy()[keep],
+        format=AIS_TIMESTAMP_FORMAT,
+        errors="coerce",
+    )
+    chunk = chunk.loc[keep, chunk.columns != "# Timestamp"].assign(Timestamp=timestamps)
+    return chunk.astype({col: "category" for col in CATEGORICAL_COLUMNS})
+
+
+def _iter_csv_chunks(csv_path: str):
     """
-    chunk = chunk.dropna().drop_duplicates()
-    chunk["Timestamp"] = pd.to_datetime(
-        chunk["# Timestamp"], dayfirst=True, errors="coerce"
+    Scans the AIS CSV as a PyArrow dataset and yields record batches as pandas
+    DataFrames. The SOG predicate is pushed into the scan, so rows of ships in
+    transit are discarded before they are converted or sent to a worker.
+    """
+    csv_format = ds.CsvFileFormat(
+        read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pacsv.ConvertOptions(
+            column_types=AIS_COLUMN_TYPES,
+            strings_can_be_null=True,
+        ),
     )
-    chunk.drop("# Timestamp", axis=1, inplace=True)
-    chunk = chunk[chunk["SOG"] <= 2]  # Filter out SOG > 2 knots
-    return chunk
+    dataset = ds.dataset(csv_path, format=csv_format)
+    for batch in dataset.to_batches(
+        columns=list(AIS_COLUMN_TYPES),
+        filter=pc.field("SOG") <= MAX_STOP_SOG,
+        batch_size=SCAN_BATCH_SIZE,
+    ):
+        yield batch.to_pandas()
 
 
 def load_and_preprocess_data_parallel(
-    csv_path: str = None, num_processes: int = None
+    csv_path: str = None, num_processes: int = None, pool=None
 ) -> pd.DataFrame:
     """
-    Loads and preprocesses AIS data from a CSV file in parallel using multiple processes.
+    Loads and preprocesses AIS data from a CSV file in parallel. The file is parsed
+    by PyArrow in large record batches, which are preprocessed by multiple processes.
+    An existing multiprocessing pool can be passed in to avoid starting a new one.
     """
     if num_processes is None:
         num_processes = mp.cpu_count()
 
-    chunksize = 1000000  # 1 million rows per chunk
-    results = []
-
-    with mp.Pool(num_processes) as pool:
-        for chunk_result in pool.imap(
-            preprocess_chunk,
-            pd.read_csv(
-                csv_path,
-                usecols=[
-                    "# Timestamp",
-                    "MMSI",
-                    "Latitude",
-                    "Longitude",
-                    "Navigational status",
-                    "SOG",
-                    "Ship type",
-                ],
-                chunksize=chunksize,
-            ),
+    # One buffer of arrays per column; the final frame is assembled with a single
+    # concatenate per column instead of a pd.concat over all chunk DataFrames.
+    column_buffers = {col: [] for col in PROCESSED_COLUMNS}
+
+    pool_context = (
+        mp.Pool(num_processes)
+        if pool is None
+        else nullcontext(pool)  # Caller owns the pool and closes it
+    )
+    with pool_context as active_pool:
+        for chunk_result in active_pool.imap(
+            preprocess_chunk, _iter_csv_chunks(csv_path)
         ):
-            results.append(chunk_result)
+            for col, buffer in column_buffers.items():
+                buffer.append(chunk_result[col].array)
 
-    df = pd.concat(results, ignore_index=True)
+    if not column_buffers["Timestamp"]:
+        return pd.DataFrame(columns=PROCESSED_COLUMNS)
+
+    # Chunks carry their own category sets; union_categoricals merges them by
+    # recoding the integer codes rather than re-hashing every string.
+    df = pd.DataFrame(
+        {
+            col: (
+                union_categoricals(buffer)
+                if col in CATEGORICAL_COLUMNS
+                else np.concatenate(buffer)
+            )
+            for col, buffer in column_buffers.items()
+        }
+    )
     return df
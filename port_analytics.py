@@ -22,7 +22,7 @@ class PortAnalyticsVisualizer:
         Initialize the visualizer with path to results folder.
 
         Args:
-            results_folder (str): Path to folder containing Excel outputs
+            results_folder (str): Path to folder containing Parquet or Excel outputs
         """
         self.results_folder = results_folder
         self.ports_df = None
@@ -30,26 +30,35 @@ class PortAnalyticsVisualizer:
         self.load_data()
 
     def load_data(self):
-        """Load the Excel files generated by the port detection system."""
+        """Load the Parquet (or legacy Excel) files generated by the port detection system."""
         try:
-            ports_file = os.path.join(self.results_folder, "detected_ports_with_polygons.xlsx")
-            stops_file = os.path.join(self.results_folder, "clustered_stops.xlsx")
-
-            if os.path.exists(ports_file):
-                self.ports_df = pd.read_excel(ports_file)
+            self.ports_df = self._load_result("detected_ports_with_polygons")
+            if self.ports_df is not None:
                 print(f"Loaded ports data: {len(self.ports_df)} port clusters")
-            else:
-                print(f"Warning: {ports_file} not found")
 
-            if os.path.exists(stops_file):
-                self.stops_df = pd.read_excel(stops_file)
+            self.stops_df = self._load_result("clustered_stops")
+            if self.stops_df is not None:
                 print(f"Loaded stops data: {len(self.stops_df)} stop events")
-            else:
-                print(f"Warning: {stops_file} not found")
 
         except Exception as e:
             print(f"Error loading data: {e}")
 
+    def _load_result(self, name):
+        """Load a result table, preferring Parquet over the older Excel output."""
+        parquet_file = os.path.join(self.results_folder, f"{name}.parquet")
+        excel_file = os.path.join(self.results_folder, f"{name}.xlsx")
+
+        if os.path.exists(parquet_file):
+            df = pd.read_parquet(parquet_file)
+            # Parquet keeps categorical dtypes; restore plain values so value_counts
+            # does not report unused categories, matching the Excel output.
+            category_columns = df.select_dtypes(include="category").columns
+            return df.astype({col: object for col in category_columns})
+        if os.path.exists(excel_file):
+            return pd.read_excel(excel_file)
+        print(f"Warning: {parquet_file} not found")
+        return None
+
     def create_distribution_analysis(self):
         """Create port size distribution and ship type distribution charts."""
         # Determine subplot layout based on available data
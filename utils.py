@@ -1,27 +1,18 @@
 import pandas as pd
-from shapely import wkt
-from shapely.errors import ShapelyError
-from shapely.geometry import Point as ShapelyPoint
+import shapely
 import geopandas
 import folium
 import os
 
 
-def _load_wkt_geometry_safe(wkt_string: str):
+def _load_wkt_geometries(wkt_values: pd.Series):
     """
-    Safely loads a WKT string to a Shapely geometry object.
-    Returns None if parsing fails.
+    Parses a Series of WKT strings to Shapely geometries in one vectorized GEOS call.
+    Missing or unparseable entries become None.
     """
-    if not isinstance(wkt_string, str):
-        return None
-    try:
-        return wkt.loads(wkt_string)
-    except ShapelyError:
-        # print(f"Warning: Could not parse WKT string (WKTReadingError): {wkt_string[:100]}...")
-        return None
-    except Exception as e:
-        # print(f"Warning: Unexpected error parsing WKT string '{wkt_string[:100]}...': {e}")
-        return None
+    wkt_array = wkt_values.to_numpy(dtype=object, copy=True)
+    wkt_array[pd.isna(wkt_array)] = None
+    return shapely.from_wkt(wkt_array, on_invalid="ignore")
 
 
 def create_and_save_folium_map(
@@ -57,10 +48,13 @@ def create_and_save_folium_map(
     df_for_map = summary_df_with_wkt.copy()
 
     # Convert WKT strings to Shapely geometry objects
-    df_for_map["geometry"] = df_for_map[wkt_column_name].apply(_load_wkt_geometry_safe)
+    geometries = _load_wkt_geometries(df_for_map[wkt_column_name])
+    df_for_map["geometry"] = geometries
 
-    # Remove rows where geometry could not be parsed or is None
-    df_for_map = df_for_map.dropna(subset=["geometry"])
+    # Keep only rows whose geometry parsed to a valid, non-empty shape
+    df_for_map = df_for_map[
+        shapely.is_valid(geometries) & ~shapely.is_empty(geometries)
+    ]
 
     if df_for_map.empty:
         print("No valid geometries found to plot after attempting to load WKT strings.")
@@ -80,43 +74,12 @@ def create_and_save_folium_map(
         default_center_lon,
         default_zoom,
     )
-    valid_geometries_gdf = gdf_ports[
-        gdf_ports.geometry.is_valid & ~gdf_ports.geometry.is_empty
-    ].copy()
-
-    if not valid_geometries_gdf.empty:
-        try:
-            gdf_projected = valid_geometries_gdf.to_crs(
-                "EPSG:3035"
-            )  # ETRS89 / LAEA Europe
-            projected_centroids = gdf_projected.geometry.centroid
-            if not projected_centroids.empty:
-                mean_projected_x = projected_centroids.x.mean()
-                mean_projected_y = projected_centroids.y.mean()
-
-                if pd.notna(mean_projected_x) and pd.notna(mean_projected_y):
-                    mean_projected_centroid_point = ShapelyPoint(
-                        mean_projected_x, mean_projected_y
-                    )
-                    mean_geo_centroid_gs = geopandas.GeoSeries(
-                        [mean_projected_centroid_point], crs="EPSG:3035"
-                    )
-                    mean_geo_centroid_epsg4326 = mean_geo_centroid_gs.to_crs(
-                        "EPSG:4326"
-                    ).iloc[0]
-                    center_lat, center_lon = (
-                        mean_geo_centroid_epsg4326.y,
-                        mean_geo_centroid_epsg4326.x,
-                    )
-        except Exception as e_center:
-            print(
-                f"Warning: Error during projected centroid calculation for map centering: {e_center}. Using fallback/default center."
-            )
-            # Fallback if sophisticated centering fails
-            total_bounds = valid_geometries_gdf.total_bounds
-            if len(total_bounds) == 4 and all(pd.notna(b) for b in total_bounds):
-                center_lon = (total_bounds[0] + total_bounds[2]) / 2
-                center_lat = (total_bounds[1] + total_bounds[3]) / 2
+    # Centre on the middle of the bounding box of all port geometries.
+    # This avoids reprojecting every polygon just to position the default view.
+    min_lon, min_lat, max_lon, max_lat = gdf_ports.total_bounds
+    if all(pd.notna(bound) for bound in (min_lon, min_lat, max_lon, max_lat)):
+        center_lat = (min_lat + max_lat) / 2
+        center_lon = (min_lon + max_lon) / 2
     else:
         print(
             "No valid geometries to calculate map center. Using default Baltic coordinates."
@@ -125,36 +88,36 @@ def create_and_save_folium_map(
     m = folium.Map(
         location=[center_lat, center_lon], zoom_start=start_zoom, tiles="OpenStreetMap"
     )
-    # Add polygons to the Folium map
-    if "geometry" in gdf_ports.columns:
-        for _, row in gdf_ports.iterrows():
-            if (
-                row["geometry"] is not None
-                and row["geometry"].is_valid
-                and not row["geometry"].is_empty
-            ):
-                try:
-                    tooltip_html = f"""
-                    <b>Cluster ID:</b> {row.get('cluster_id', 'N/A')}<br>
-                    <b>Unique Ships:</b> {row.get('num_unique_ships', 'N/A')}<br>
-                    <b>Avg. Duration (h):</b> {row.get('avg_stop_duration_hours', 0.0):.1f}<br>
-                    <b>Total Stops:</b> {row.get('num_stops', 'N/A')}
-                    """
-
-                    folium.GeoJson(
-                        row["geometry"].__geo_interface__,
-                        style_function=lambda x: {
-                            "fillColor": "red",
-                            "color": "darkblue",
-                            "weight": 1.5,
-                            "fillOpacity": 0.45,
-                        },  # Slightly less transparent
-                        tooltip=folium.Tooltip(tooltip_html),
-                    ).add_to(m)
-                except Exception as e_geojson:
-                    print(
-                        f"Could not add geometry for cluster {row.get('cluster_id', 'N/A')} to Folium map: {e_geojson}"
-                    )
+    # Add all polygons to the Folium map as a single GeoJSON layer
+    tooltip_columns = {
+        "cluster_id": "Cluster ID:",
+        "num_unique_ships": "Unique Ships:",
+        "avg_stop_duration_hours": "Avg. Duration (h):",
+        "num_stops": "Total Stops:",
+    }
+    tooltip_columns = {
+        col: alias for col, alias in tooltip_columns.items() if col in gdf_ports.columns
+    }
+    gdf_layer = gdf_ports[list(tooltip_columns) + ["geometry"]]
+    if "avg_stop_duration_hours" in tooltip_columns:
+        gdf_layer = gdf_layer.assign(
+            avg_stop_duration_hours=gdf_layer["avg_stop_duration_hours"].round(1)
+        )
+    try:
+        folium.GeoJson(
+            data=gdf_layer,
+            style_function=lambda x: {
+                "fillColor": "red",
+                "color": "darkblue",
+                "weight": 1.5,
+                "fillOpacity": 0.45,
+            },  # Slightly less transparent
+            tooltip=folium.GeoJsonTooltip(
+                fields=list(tooltip_columns), aliases=list(tooltip_columns.values())
+            ),
+        ).add_to(m)
+    except Exception as e_geojson:
+        print(f"Could not add port geometries to Folium map: {e_geojson}")
 
     try:
         os.makedirs(output_folder, exist_ok=True)  # Create folder if it doesn't exist